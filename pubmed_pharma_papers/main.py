@@ -39,6 +39,15 @@ def main() -> int:
         default=100,
         help="Maximum number of results to fetch (default: 100)"
     )
+    parser.add_argument(
+        "-k", "--api-key",
+        help="NCBI API key, raises the request rate limit from 3 to 10 per second"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Fetch all papers from PubMed instead of reusing previously fetched ones"
+    )
 
     args = parser.parse_args()
 
@@ -48,18 +57,23 @@ def main() -> int:
             print(f"Output file: {args.file if args.file else 'console'}")
 
         # Initialize the PubMed client and paper processor
-        pubmed_client = PubMedClient()
+        pubmed_client = PubMedClient(
+            api_key=args.api_key,
+            cache_dir=None if args.no_cache else PubMedClient.DEFAULT_CACHE_DIR
+        )
         paper_processor = PaperProcessor(debug=args.debug)
 
         # Search for papers
-        pmids = pubmed_client.search(args.query, max_results=args.max_results, debug=args.debug)
+        pmids, history = pubmed_client.search_with_history(
+            args.query, max_results=args.max_results, debug=args.debug
+        )
 
         if not pmids:
             print("No papers found matching the query.")
             return 0
 
         # Fetch paper details
-        papers = pubmed_client.fetch_details(pmids, debug=args.debug)
+        papers = pubmed_client.fetch_details(pmids, debug=args.debug, history=history)
 
         # Process papers to find those with pharma affiliations
         processed_papers = paper_processor.process_papers(papers)
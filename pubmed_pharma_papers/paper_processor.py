@@ -1,14 +1,142 @@
 """
 Module for processing PubMed papers and identifying authors with pharmaceutical company affiliations.
 """
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Callable, Dict, List, Any, Optional, Pattern, Set, Tuple
+import functools
+import operator
 import re
+import sys
 import csv
 import io
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Common pharma company endings, e.g. "Novartis Pharma AG"
+_COMPANY_END_RE = re.compile(r'(?:inc|corp|co\.|ltd|llc|gmbh|sa|ag|pty)\.?$')
+
+# Write CSV files through a 1 MiB buffer to keep the number of write calls low
+_CSV_BUFFER_SIZE = 1 << 20
+
+# Company name before the first comma or parenthesis
+_COMPANY_NAME_RE = re.compile(r'^([^,\(]+)')
+
+# Kinds of terms found in an affiliation, the bits match the group numbers of the classifier regex
+_ACADEMIC = 1 << 1
+_PHARMA = 1 << 2
+_INDICATOR = 1 << 3
+_COMPANY_END = 1 << 4
+
+
+def _build_automaton(pharma_terms: Set[str], academic_terms: Set[str],
+                     company_indicators: Tuple[str, ...]) -> Optional[Any]:
+    """
+    Compile all affiliation terms into a single Aho-Corasick automaton.
+
+    Args:
+        pharma_terms: Pharmaceutical and biotech company terms
+        academic_terms: Academic institution terms
+        company_indicators: Terms indicating a company
+
+    Returns:
+        The automaton, or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for term_kind, terms in ((_ACADEMIC, academic_terms), (_PHARMA, pharma_terms),
+                             (_INDICATOR, company_indicators)):
+        for term in terms:
+            automaton.add_word(term, term_kind)
+    automaton.make_automaton()
+
+    return automaton
+
+
+def _build_hyperscan_db(pharma_terms: Set[str], academic_terms: Set[str],
+                        company_indicators: Tuple[str, ...]) -> Optional[Any]:
+    """
+    Compile all affiliation terms and company endings into a single Hyperscan database.
+
+    Args:
+        pharma_terms: Pharmaceutical and biotech company terms
+        academic_terms: Academic institution terms
+        company_indicators: Terms indicating a company
+
+    Returns:
+        The database, or None if hyperscan is not installed
+    """
+    if hyperscan is None:
+        return None
+
+    expressions = []
+    ids = []
+    for term_kind, terms in ((_ACADEMIC, academic_terms), (_PHARMA, pharma_terms),
+                             (_INDICATOR, company_indicators)):
+        for term in sorted(terms):
+            expressions.append(re.escape(term).encode())
+            ids.append(term_kind)
+    expressions.append(_COMPANY_END_RE.pattern.encode())
+    ids.append(_COMPANY_END)
+
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    database.compile(
+        expressions=expressions,
+        ids=ids,
+        elements=len(expressions),
+        flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+    )
+
+    return database
+
+
+def _on_hyperscan_match(term_kind: int, start: int, end: int, flags: int, found: List[int]) -> None:
+    """Collect the kind of term matched by a Hyperscan scan."""
+    found.append(term_kind)
+
+
+def _build_classifier_re(pharma_terms: Set[str], academic_terms: Set[str],
+                         company_indicators: Tuple[str, ...]) -> Pattern[str]:
+    """
+    Compile all affiliation terms and company endings into a single alternation.
+
+    The alternation sits inside a lookahead so that overlapping terms are reported
+    at every position. Academic terms come first, so "medical center" wins over "medical".
+
+    Args:
+        pharma_terms: Pharmaceutical and biotech company terms
+        academic_terms: Academic institution terms
+        company_indicators: Terms indicating a company
+
+    Returns:
+        Compiled pattern whose matched group number is the kind of term found
+    """
+    def alternation(terms):
+        return "|".join(re.escape(term) for term in sorted(terms))
+
+    return re.compile(
+        f"(?=({alternation(academic_terms)})"
+        f"|({alternation(pharma_terms)})"
+        f"|({alternation(company_indicators)})"
+        f"|({_COMPANY_END_RE.pattern}))"
+    )
+
 
 class PaperProcessor:
-    """Class for processing PubMed papers and identifying pharma-affiliated authors."""
+    """
+    Class for processing PubMed papers and identifying pharma-affiliated authors.
+
+    Subclasses may override the term sets below, the affiliation scanners are
+    compiled again for every subclass.
+    """
 
     # Common pharmaceutical and biotech company terms for identification
     PHARMA_TERMS = {
@@ -24,6 +152,26 @@ class PaperProcessor:
         "national", "federal", "ministry", "department"
     }
 
+    # Terms indicating that a pharma affiliation is a company
+    COMPANY_INDICATORS = (" inc", " corp", " co.", " ltd", " llc", "company", " sa", " ag", " gmbh")
+
+    def __init_subclass__(cls, **kwargs):
+        """Compile the affiliation scanners for the term sets of a subclass."""
+        super().__init_subclass__(**kwargs)
+        cls._compile_terms()
+
+    @classmethod
+    def _compile_terms(cls) -> None:
+        """
+        Compile all terms of the class so that each affiliation is scanned in a single pass.
+        """
+        cls._automaton = _build_automaton(cls.PHARMA_TERMS, cls.ACADEMIC_TERMS, cls.COMPANY_INDICATORS)
+        cls._hyperscan_db = _build_hyperscan_db(cls.PHARMA_TERMS, cls.ACADEMIC_TERMS, cls.COMPANY_INDICATORS)
+        cls._classifier_re = _build_classifier_re(cls.PHARMA_TERMS, cls.ACADEMIC_TERMS, cls.COMPANY_INDICATORS)
+
+        # Affiliation strings repeat heavily across authors and papers, so results are cached per class
+        cls._classify_cached = staticmethod(functools.lru_cache(maxsize=8192)(cls._classify))
+
     def __init__(self, debug: bool = False):
         """
         Initialize the paper processor.
@@ -37,6 +185,19 @@ class PaperProcessor:
         """
         Determine if an affiliation is from a pharmaceutical or biotech company.
 
+        Args:
+            affiliation: The affiliation string to check
+
+        Returns:
+            True if the affiliation appears to be from a pharma/biotech company
+        """
+        return self._classify_cached(affiliation)
+
+    @classmethod
+    def _classify(cls, affiliation: str) -> bool:
+        """
+        Uncached implementation of is_pharma_affiliation.
+
         Args:
             affiliation: The affiliation string to check
 
@@ -49,24 +210,54 @@ class PaperProcessor:
         # Convert to lowercase for case-insensitive matching
         affiliation_lower = affiliation.lower()
 
-        # Check for academic terms first (negative signal)
-        for term in self.ACADEMIC_TERMS:
-            if term in affiliation_lower:
-                return False
-
-        # Look for pharmaceutical terms
-        for term in self.PHARMA_TERMS:
-            if term in affiliation_lower:
-                # Check for company indicators
-                if any(indicator in affiliation_lower for indicator in
-                       [" inc", " corp", " co.", " ltd", " llc", "company", " sa", " ag", " gmbh"]):
-                    return True
-
-        # Check for common pharma company endings
-        if re.search(r'(?:inc|corp|co\.|ltd|llc|gmbh|sa|ag|pty)\.?$', affiliation_lower.strip()):
+        term_kinds = cls._scan_terms(affiliation_lower)
+
+        # Academic terms are a negative signal
+        if term_kinds & _ACADEMIC:
+            return False
+
+        # Pharmaceutical terms together with a company indicator
+        if term_kinds & _PHARMA and term_kinds & _INDICATOR:
             return True
 
-        return False
+        # Common pharma company endings
+        return bool(term_kinds & _COMPANY_END)
+
+    @classmethod
+    def _scan_terms(cls, affiliation_lower: str) -> int:
+        """
+        Find the kinds of terms present in a lowercase affiliation string.
+
+        Args:
+            affiliation_lower: The lowercase affiliation string
+
+        Returns:
+            Bit set of the kinds of terms found
+        """
+        # Trailing whitespace never belongs to a term and would hide company endings
+        affiliation_lower = affiliation_lower.rstrip()
+        term_kinds = 0
+
+        if cls._hyperscan_db is not None:
+            found = []
+            cls._hyperscan_db.scan(affiliation_lower.encode(), match_event_handler=_on_hyperscan_match,
+                                   context=found)
+            for term_kind in found:
+                term_kinds |= term_kind
+        elif cls._automaton is not None:
+            for _, term_kind in cls._automaton.iter(affiliation_lower):
+                if term_kind == _ACADEMIC:
+                    return _ACADEMIC
+                term_kinds |= term_kind
+
+            # The company ending only matters if the terms alone do not already decide
+            if not (term_kinds & _PHARMA and term_kinds & _INDICATOR) and _COMPANY_END_RE.search(affiliation_lower):
+                term_kinds |= _COMPANY_END
+        else:
+            for match in cls._classifier_re.finditer(affiliation_lower):
+                term_kinds |= 1 << match.lastindex
+
+        return term_kinds
 
     def extract_company_name(self, affiliation: str) -> str:
         """
@@ -78,16 +269,7 @@ class PaperProcessor:
         Returns:
             The extracted company name
         """
-        # This is a simplified version - in a real application, this would be more sophisticated
-        if not affiliation:
-            return ""
-
-        # Try to extract the company name before a comma or parenthesis
-        match = re.search(r'^([^,\(]+)', affiliation)
-        if match:
-            return match.group(1).strip()
-
-        return affiliation
+        return _extract_company_name(affiliation)
 
     def process_papers(self, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -99,43 +281,17 @@ class PaperProcessor:
         Returns:
             List of papers with pharma affiliation information added
         """
-        processed_papers = []
-
-        for paper in papers:
-            pharma_authors = []
-            company_affiliations = set()
-            corresponding_email = ""
-
-            # Process authors and their affiliations
-            for author in paper.get("authors", []):
-                author_name = author.get("name", "")
-                affiliations = author.get("affiliations", [])
-
-                for affiliation in affiliations:
-                    if self.is_pharma_affiliation(affiliation):
-                        pharma_authors.append(author_name)
-                        company_name = self.extract_company_name(affiliation)
-                        if company_name:
-                            company_affiliations.add(company_name)
-
-                # Check if this is a corresponding author
-                if author.get("is_corresponding", False) and author.get("email"):
-                    corresponding_email = author.get("email")
-
-            # Only include papers with at least one pharma-affiliated author
-            if pharma_authors:
-                processed_paper = {
-                    "PubmedID": paper.get("pmid", ""),
-                    "Title": paper.get("title", ""),
-                    "Publication Date": paper.get("publication_date", ""),
-                    "Non-academic Author(s)": "; ".join(pharma_authors),
-                    "Company Affiliation(s)": "; ".join(company_affiliations),
-                    "Corresponding Author Email": corresponding_email
-                }
-                processed_papers.append(processed_paper)
-
-                if self.debug:
-                    print(f"Found paper with pharma affiliations: {paper.get('title')}")
+        results = [
+            _process_one_paper(paper, self.is_pharma_affiliation, self.extract_company_name)
+            for paper in papers
+        ]
+
+        # Only include papers with at least one pharma-affiliated author
+        processed_papers = [processed_paper for processed_paper in results if processed_paper is not None]
+
+        if self.debug:
+            for processed_paper in processed_papers:
+                print(f"Found paper with pharma affiliations: {processed_paper['Title']}")
 
         return processed_papers
 
@@ -162,21 +318,99 @@ class PaperProcessor:
             "Corresponding Author Email"
         ]
 
+        # Build each row as a tuple in column order instead of letting DictWriter look up every field
+        row_values = operator.itemgetter(*fieldnames)
+
         if file_path is None:
             # Return as string
             output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(papers)
+            writer = csv.writer(output)
+            writer.writerow(fieldnames)
+            writer.writerows(map(row_values, papers))
             return output.getvalue()
         else:
             # Write to file
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(papers)
+            with open(file_path, 'w', newline='', encoding='utf-8', buffering=_CSV_BUFFER_SIZE) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                writer.writerows(map(row_values, papers))
 
             if self.debug:
                 print(f"Exported {len(papers)} papers to {file_path}")
 
-            return None
\ No newline at end of file
+            return None
+
+
+PaperProcessor._compile_terms()
+
+
+# Company names repeat heavily across authors and papers, so results are cached
+@functools.lru_cache(maxsize=8192)
+def _extract_company_name(affiliation: str) -> str:
+    """
+    Cached implementation of PaperProcessor.extract_company_name.
+
+    Args:
+        affiliation: The affiliation string
+
+    Returns:
+        The extracted company name
+    """
+    # This is a simplified version - in a real application, this would be more sophisticated
+    if not affiliation:
+        return ""
+
+    # Try to extract the company name before a comma or parenthesis
+    match = _COMPANY_NAME_RE.search(affiliation)
+    if match:
+        # Interned so that a company named in many affiliations is a single string object,
+        # which makes the set of company affiliations per paper cheaper to build
+        return sys.intern(match.group(1).strip())
+
+    return affiliation
+
+
+def _process_one_paper(paper: Dict[str, Any], is_pharma_affiliation: Callable[[str], bool],
+                       extract_company_name: Callable[[str], str]) -> Optional[Dict[str, Any]]:
+    """
+    Process a single paper to identify its pharma-affiliated authors.
+
+    Args:
+        paper: Paper dictionary from PubMed
+        is_pharma_affiliation: Function classifying a single affiliation
+        extract_company_name: Function extracting the company name from an affiliation
+
+    Returns:
+        The paper with pharma affiliation information, or None if it has no pharma-affiliated author
+    """
+    pharma_authors = []
+    company_affiliations = set()
+    corresponding_email = ""
+
+    # Process authors and their affiliations
+    for author in paper.get("authors", []):
+        author_name = author.get("name", "")
+        affiliations = author.get("affiliations", [])
+
+        for affiliation in affiliations:
+            if is_pharma_affiliation(affiliation):
+                pharma_authors.append(author_name)
+                company_name = extract_company_name(affiliation)
+                if company_name:
+                    company_affiliations.add(company_name)
+
+        # Check if this is a corresponding author
+        if author.get("is_corresponding", False) and author.get("email"):
+            corresponding_email = author.get("email")
+
+    if not pharma_authors:
+        return None
+
+    return {
+        "PubmedID": paper.get("pmid", ""),
+        "Title": paper.get("title", ""),
+        "Publication Date": paper.get("publication_date", ""),
+        "Non-academic Author(s)": "; ".join(pharma_authors),
+        "Company Affiliation(s)": "; ".join(sorted(company_affiliations)),
+        "Corresponding Author Email": corresponding_email
+    }
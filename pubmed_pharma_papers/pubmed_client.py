@@ -1,29 +1,119 @@
 """
 PubMed client module that handles API calls to the PubMed API.
 """
-from typing import Dict, List, Any, Optional
+from typing import BinaryIO, Dict, List, Any, NamedTuple, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
 import urllib.parse
 import time
+import diskcache
+import msgpack
 import requests
-import xml.etree.ElementTree as ET
+from requests.adapters import HTTPAdapter
+from lxml import etree
 import re  # Add this import for regex
 
+# Email addresses embedded in affiliation text
+_EMAIL_RE = re.compile(r'([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)')
+
+
+class SearchHistory(NamedTuple):
+    """Location of search results stored on the PubMed history server."""
+
+    webenv: str
+    query_key: str
+
+
+class _RateLimiter:
+    """
+    Thread-safe token bucket used to stay within the PubMed API rate limits.
+
+    The bucket holds at most one token, so requests are evenly spaced and never
+    sent in a burst that NCBI would answer with 429 Too Many Requests.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Maximum number of requests per second
+        """
+        self.rate = rate
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a request can be sent without exceeding the rate limit.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
 
 class PubMedClient:
     """Client for interacting with the PubMed API."""
 
     BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
 
-    def __init__(self, tool: str = "pubmed-pharma-papers", email: str = "your-email@example.com"):
+    # NCBI allows 3 requests per second, or 10 per second with an API key
+    MAX_REQUESTS_PER_SECOND = 3
+    MAX_REQUESTS_PER_SECOND_WITH_KEY = 10
+
+    # Parsed papers are cached on disk by PubMed ID for 30 days
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pubmed-pharma")
+    CACHE_EXPIRE_SECONDS = 30 * 24 * 60 * 60
+
+    # Part of every cache key, bump it whenever the layout of the parsed paper dictionaries changes
+    CACHE_FORMAT_VERSION = 1
+
+    def __init__(self, tool: str = "pubmed-pharma-papers", email: str = "your-email@example.com",
+                 api_key: Optional[str] = None, cache_dir: Optional[str] = None):
         """
         Initialize the PubMed client.
 
         Args:
             tool: Name of the tool using the API
             email: Email address of the user
+            api_key: NCBI API key, raises the rate limit when provided
+            cache_dir: Directory of the on-disk paper cache, e.g. DEFAULT_CACHE_DIR,
+                caching is disabled if None
         """
         self.tool = tool
         self.email = email
+        self.api_key = api_key
+        self._cache = diskcache.Cache(cache_dir) if cache_dir else None
+
+        rate = self.MAX_REQUESTS_PER_SECOND_WITH_KEY if api_key else self.MAX_REQUESTS_PER_SECOND
+        self._limiter = _RateLimiter(rate)
+
+        # Twice as many fetch workers as requests per second, so the next chunks are
+        # already downloading while the workers holding earlier chunks are parsing them
+        self._fetch_workers = 2 * rate
+
+        # Reuse connections across requests so the TLS handshake is only paid once
+        self._session = requests.Session()
+        self._session.headers.update({
+            "User-Agent": f"{tool} ({email})",
+            # efetch XML compresses very well, the streamed body is inflated by urllib3
+            "Accept-Encoding": "gzip, deflate"
+        })
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(16, self._fetch_workers))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
     def search(self, query: str, max_results: int = 100, debug: bool = False) -> List[str]:
         """
@@ -37,6 +127,26 @@ class PubMedClient:
         Returns:
             List of PubMed IDs matching the query
         """
+        id_list, _ = self.search_with_history(query, max_results=max_results, debug=debug)
+        return id_list
+
+    def search_with_history(self, query: str, max_results: int = 100,
+                            debug: bool = False) -> Tuple[List[str], Optional[SearchHistory]]:
+        """
+        Search for papers in PubMed and keep the results on the history server.
+
+        Passing the returned history to fetch_details lets it page through the results
+        instead of sending every PubMed ID back to the API.
+
+        Args:
+            query: The search query
+            max_results: Maximum number of results to return
+            debug: Whether to print debug information
+
+        Returns:
+            List of PubMed IDs matching the query and the history server location of the results,
+            or None if the API did not return one
+        """
         if debug:
             print(f"Searching PubMed for: {query}")
 
@@ -51,12 +161,16 @@ class PubMedClient:
             "retmax": max_results,
             "retmode": "json",
             "sort": "relevance",
+            "usehistory": "y",
             "tool": self.tool,
             "email": self.email
         }
+        if self.api_key:
+            params["api_key"] = self.api_key
 
         # Make the search request
-        response = requests.get(search_url, params=params)
+        self._limiter.acquire()
+        response = self._session.get(search_url, params=params)
         response.raise_for_status()  # Raise exception for HTTP errors
 
         search_results = response.json()
@@ -64,17 +178,82 @@ class PubMedClient:
         if debug:
             print(f"Found {len(search_results.get('esearchresult', {}).get('idlist', []))} papers")
 
-        # Extract IDs from search results
-        id_list = search_results.get("esearchresult", {}).get("idlist", [])
-        return id_list
+        # Extract IDs and the history server location from search results
+        esearch_result = search_results.get("esearchresult", {})
+        id_list = esearch_result.get("idlist", [])
+
+        history = None
+        if esearch_result.get("webenv") and esearch_result.get("querykey"):
+            history = SearchHistory(esearch_result["webenv"], esearch_result["querykey"])
 
-    def fetch_details(self, pmid_list: List[str], debug: bool = False) -> List[Dict[str, Any]]:
+        return id_list, history
+
+    def fetch_details(self, pmid_list: List[str], debug: bool = False,
+                      history: Optional[SearchHistory] = None) -> List[Dict[str, Any]]:
         """
         Fetch detailed information for a list of PubMed IDs.
 
         Args:
             pmid_list: List of PubMed IDs
             debug: Whether to print debug information
+            history: History server location of the search that returned pmid_list,
+                if given the results are paged from there instead of sending the IDs
+
+        Returns:
+            List of dictionaries containing paper details
+        """
+        if not pmid_list:
+            return []
+
+        # Look up papers fetched by earlier runs, only the missing ones hit the network
+        cached_papers = {}
+        if self._cache is not None:
+            for pmid in pmid_list:
+                data = self._cache.get(self._cache_key(pmid))
+                if data is not None:
+                    cached_papers[pmid] = msgpack.unpackb(data)
+
+            if debug:
+                print(f"Found {len(cached_papers)} papers in the cache")
+
+        missing_pmids = [pmid for pmid in pmid_list if pmid not in cached_papers]
+
+        # History server pages cover the whole result list, so they can't skip cached papers
+        fetched_papers = self._fetch_papers(missing_pmids, debug, history if not cached_papers else None)
+
+        if self._cache is not None:
+            for paper in fetched_papers:
+                self._cache.set(self._cache_key(paper["pmid"]), msgpack.packb(paper),
+                                expire=self.CACHE_EXPIRE_SECONDS)
+
+        # Return the papers in the order of pmid_list
+        papers_by_pmid = {**cached_papers, **{paper["pmid"]: paper for paper in fetched_papers}}
+        papers = [papers_by_pmid.pop(pmid) for pmid in pmid_list if pmid in papers_by_pmid]
+        papers.extend(papers_by_pmid.values())
+
+        return papers
+
+    def _cache_key(self, pmid: str) -> str:
+        """
+        Build the cache key of a paper.
+
+        Args:
+            pmid: PubMed ID of the paper
+
+        Returns:
+            The PubMed ID prefixed with the cache format version
+        """
+        return f"v{self.CACHE_FORMAT_VERSION}:{pmid}"
+
+    def _fetch_papers(self, pmid_list: List[str], debug: bool = False,
+                      history: Optional[SearchHistory] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch detailed information for a list of PubMed IDs from the API.
+
+        Args:
+            pmid_list: List of PubMed IDs
+            debug: Whether to print debug information
+            history: History server location of the search that returned pmid_list
 
         Returns:
             List of dictionaries containing paper details
@@ -88,41 +267,72 @@ class PubMedClient:
         # Construct fetch URL
         fetch_url = f"{self.BASE_URL}efetch.fcgi"
 
-        # Split into chunks of 100 IDs to avoid URL length limitations
-        chunk_size = 100
-        all_papers = []
+        # The IDs are sent in the request body, so chunks are not limited by the URL length,
+        # 500 IDs per request keeps each response at a manageable size
+        chunk_size = 500
+        starts = range(0, len(pmid_list), chunk_size)
+
+        if history is not None:
+            # Page through the results on the history server, the IDs never have to be sent
+            chunks = [
+                {
+                    "WebEnv": history.webenv,
+                    "query_key": history.query_key,
+                    "retstart": start,
+                    "retmax": min(chunk_size, len(pmid_list) - start)
+                }
+                for start in starts
+            ]
+        else:
+            chunks = [{"id": ",".join(pmid_list[start:start + chunk_size])} for start in starts]
+
+        # Fetch the chunks concurrently, the rate limiter keeps us within the API limits
+        with ThreadPoolExecutor(max_workers=self._fetch_workers) as executor:
+            results = executor.map(lambda chunk: self._fetch_chunk(fetch_url, chunk, debug), chunks)
+            all_papers = [paper for papers in results for paper in papers]
 
-        for i in range(0, len(pmid_list), chunk_size):
-            chunk = pmid_list[i:i + chunk_size]
+        return all_papers
 
-            params = {
-                "db": "pubmed",
-                "id": ",".join(chunk),
-                "retmode": "xml",
-                "tool": self.tool,
-                "email": self.email
-            }
+    def _fetch_chunk(self, fetch_url: str, chunk: Dict[str, Any], debug: bool = False) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse the details for a single chunk of papers.
 
-            # Make the fetch request
-            response = requests.get(fetch_url, params=params)
-            response.raise_for_status()
+        Args:
+            fetch_url: URL of the efetch endpoint
+            chunk: Parameters selecting the papers, either the PubMed IDs or a history server page
+            debug: Whether to print debug information
 
-            # Parse the XML response and extract paper details
-            papers = self._parse_papers(response.text, debug)
-            all_papers.extend(papers)
+        Returns:
+            List of dictionaries containing paper details
+        """
+        params = {
+            "db": "pubmed",
+            **chunk,
+            "retmode": "xml",
+            "tool": self.tool,
+            "email": self.email
+        }
+        if self.api_key:
+            params["api_key"] = self.api_key
 
-            # Be nice to the API and wait a bit between requests
-            if i + chunk_size < len(pmid_list):
-                time.sleep(0.5)
+        # Make the fetch request, the body is read while it is being parsed
+        self._limiter.acquire()
+        with self._session.post(fetch_url, data=params, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
 
-        return all_papers
+            # Parse the XML response and extract paper details
+            return self._parse_papers(response.raw, debug)
 
-    def _parse_papers(self, xml_content: str, debug: bool = False) -> List[Dict[str, Any]]:
+    def _parse_papers(self, xml_stream: BinaryIO, debug: bool = False) -> List[Dict[str, Any]]:
         """
         Parse XML content to extract paper details.
 
+        Articles are parsed one at a time and discarded once processed,
+        so only a single article is kept in memory.
+
         Args:
-            xml_content: XML content from PubMed
+            xml_stream: Binary file-like object with XML content from PubMed
             debug: Whether to print debug information
 
         Returns:
@@ -131,123 +341,138 @@ class PubMedClient:
         papers = []
 
         try:
-            # Parse XML content
-            root = ET.fromstring(xml_content)
+            context = etree.iterparse(xml_stream, tag="PubmedArticle")
 
-            # Find all PubmedArticle elements
-            articles = root.findall(".//PubmedArticle")
+            for _, article in context:
+                paper = self._parse_article(article)
+                if paper is not None:
+                    papers.append(paper)
 
-            for article in articles:
-                paper = {}
+                # Free the processed article and the siblings before it
+                article.clear()
+                while article.getprevious() is not None:
+                    del article.getparent()[0]
 
-                # Extract PubMed ID
-                pmid_elem = article.find(".//PMID")
-                if pmid_elem is not None:
-                    paper["pmid"] = pmid_elem.text
-                else:
-                    continue  # Skip if no PMID
-
-                # Extract title
-                title_elem = article.find(".//ArticleTitle")
-                if title_elem is not None:
-                    paper["title"] = title_elem.text
-                else:
-                    paper["title"] = ""
-
-                # Extract publication date
-                pub_date = ""
-                pub_date_elem = article.find(".//PubDate")
-                if pub_date_elem is not None:
-                    year = pub_date_elem.findtext("Year", "")
-                    month = pub_date_elem.findtext("Month", "")
-                    day = pub_date_elem.findtext("Day", "")
-
-                    if year:
-                        pub_date = year
-                        if month:
-                            pub_date = f"{month} {pub_date}"
-                            if day:
-                                pub_date = f"{day} {pub_date}"
-
-                paper["publication_date"] = pub_date
-
-                # Extract authors and their affiliations
-                authors = []
-                author_list = article.find(".//AuthorList")
-
-                if author_list is not None:
-                    for author_elem in author_list.findall("Author"):
-                        author = {}
-
-                        # Get author name
-                        last_name = author_elem.findtext("LastName", "")
-                        fore_name = author_elem.findtext("ForeName", "")
-                        initials = author_elem.findtext("Initials", "")
-
-                        if last_name:
-                            if fore_name:
-                                author["name"] = f"{fore_name} {last_name}"
-                            elif initials:
-                                author["name"] = f"{initials} {last_name}"
-                            else:
-                                author["name"] = last_name
-                        else:
-                            # If no individual name parts, try CollectiveName
-                            collective_name = author_elem.findtext("CollectiveName", "")
-                            if collective_name:
-                                author["name"] = collective_name
-                            else:
-                                continue  # Skip author with no name
-
-                        # Get affiliations
-                        affiliations = []
-
-                        # Check for AffiliationInfo elements (newer format)
-                        for aff_info in author_elem.findall(".//AffiliationInfo"):
-                            aff_text = aff_info.findtext("Affiliation", "")
-                            if aff_text:
-                                affiliations.append(aff_text)
-
-                        # If no AffiliationInfo found, look for direct Affiliation element (older format)
-                        if not affiliations:
-                            aff_text = author_elem.findtext("Affiliation", "")
-                            if aff_text:
-                                affiliations.append(aff_text)
-
-                        author["affiliations"] = affiliations
-
-                        # Check for corresponding author
-                        # PubMed doesn't consistently mark corresponding authors, but we can check
-                        # for EqualContrib attribute or look for author with email
-                        author["is_corresponding"] = False
-                        author["email"] = ""
-
-                        # Try to find email in identifiers
-                        for identifier in author_elem.findall(".//Identifier"):
-                            if identifier.get("Source") == "email":
-                                author["email"] = identifier.text
-                                author["is_corresponding"] = True
-                                break
-
-                        # Sometimes emails are included in the affiliation text
-                        if not author["email"]:
-                            for aff in affiliations:
-                                email_match = re.search(r'([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)', aff)
-                                if email_match:
-                                    author["email"] = email_match.group(1)
-                                    author["is_corresponding"] = True
-                                    break
-
-                        authors.append(author)
-
-                paper["authors"] = authors
-                papers.append(paper)
-
-        except ET.ParseError as e:
+        except etree.XMLSyntaxError as e:
             if debug:
                 print(f"Error parsing XML: {e}")
 
         if debug and not papers:
             print("No papers were successfully parsed from the XML")
 
-        return papers
\ No newline at end of file
+        return papers
+
+    def _parse_article(self, article: etree._Element) -> Optional[Dict[str, Any]]:
+        """
+        Extract the paper details from a single PubmedArticle element.
+
+        Args:
+            article: The PubmedArticle element
+
+        Returns:
+            Dictionary containing paper details, or None if the article has no PMID
+        """
+        paper = {}
+
+        # Extract PubMed ID
+        pmid_elem = article.find("MedlineCitation/PMID")
+        if pmid_elem is not None:
+            paper["pmid"] = pmid_elem.text
+        else:
+            return None  # Skip if no PMID
+
+        # Extract title
+        title_elem = article.find("MedlineCitation/Article/ArticleTitle")
+        if title_elem is not None:
+            paper["title"] = title_elem.text
+        else:
+            paper["title"] = ""
+
+        # Extract publication date
+        pub_date = ""
+        pub_date_elem = article.find("MedlineCitation/Article/Journal/JournalIssue/PubDate")
+        if pub_date_elem is not None:
+            year = pub_date_elem.findtext("Year", "")
+            month = pub_date_elem.findtext("Month", "")
+            day = pub_date_elem.findtext("Day", "")
+
+            if year:
+                pub_date = year
+                if month:
+                    pub_date = f"{month} {pub_date}"
+                    if day:
+                        pub_date = f"{day} {pub_date}"
+
+        paper["publication_date"] = pub_date
+
+        # Extract authors and their affiliations
+        authors = []
+        author_list = article.find("MedlineCitation/Article/AuthorList")
+
+        if author_list is not None:
+            for author_elem in author_list.findall("Author"):
+                author = {}
+                findtext = author_elem.findtext
+
+                # Get author name
+                last_name = findtext("LastName", "")
+                fore_name = findtext("ForeName", "")
+                initials = findtext("Initials", "")
+
+                if last_name:
+                    if fore_name:
+                        author["name"] = f"{fore_name} {last_name}"
+                    elif initials:
+                        author["name"] = f"{initials} {last_name}"
+                    else:
+                        author["name"] = last_name
+                else:
+                    # If no individual name parts, try CollectiveName
+                    collective_name = findtext("CollectiveName", "")
+                    if collective_name:
+                        author["name"] = collective_name
+                    else:
+                        continue  # Skip author with no name
+
+                # Get affiliations
+                affiliations = []
+
+                # Check for AffiliationInfo elements (newer format), always direct children of Author
+                for aff_info in author_elem.findall("AffiliationInfo"):
+                    aff_text = aff_info.findtext("Affiliation", "")
+                    if aff_text:
+                        affiliations.append(aff_text)
+
+                # If no AffiliationInfo found, look for direct Affiliation element (older format)
+                if not affiliations:
+                    aff_text = findtext("Affiliation", "")
+                    if aff_text:
+                        affiliations.append(aff_text)
+
+                author["affiliations"] = affiliations
+
+                # Check for corresponding author
+                # PubMed doesn't consistently mark corresponding authors, but we can check
+                # for EqualContrib attribute or look for author with email
+                author["is_corresponding"] = False
+                author["email"] = ""
+
+                # Try to find email in identifiers, always direct children of Author
+                for identifier in author_elem.findall("Identifier"):
+                    if identifier.get("Source") == "email":
+                        author["email"] = identifier.text
+                        author["is_corresponding"] = True
+                        break
+
+                # Sometimes emails are included in the affiliation text, a single search over
+                # all affiliations finds the first one as no match can span the line break
+                if not author["email"] and affiliations:
+                    email_match = _EMAIL_RE.search("\n".join(affiliations))
+                    if email_match:
+                        author["email"] = email_match.group(1)
+                        author["is_corresponding"] = True
+
+                authors.append(author)
+
+        paper["authors"] = authors
+        return paper
@@ -0,0 +1,136 @@
+"""
+Tests for the affiliation classifier of PaperProcessor.
+"""
+import random
+import re
+
+import pytest
+
+from pubmed_pharma_papers import paper_processor
+from pubmed_pharma_papers.paper_processor import PaperProcessor
+
+INDICATORS = [" inc", " corp", " co.", " ltd", " llc", "company", " sa", " ag", " gmbh"]
+
+
+def reference_is_pharma_affiliation(affiliation):
+    """The original term-by-term loop that the compiled scanners replace."""
+    if not affiliation:
+        return False
+
+    affiliation_lower = affiliation.lower()
+
+    for term in PaperProcessor.ACADEMIC_TERMS:
+        if term in affiliation_lower:
+            return False
+
+    for term in PaperProcessor.PHARMA_TERMS:
+        if term in affiliation_lower:
+            if any(indicator in affiliation_lower for indicator in INDICATORS):
+                return True
+
+    if re.search(r'(?:inc|corp|co\.|ltd|llc|gmbh|sa|ag|pty)\.?$', affiliation_lower.strip()):
+        return True
+
+    return False
+
+
+def random_affiliations(count=5000, seed=1):
+    """Affiliations assembled from terms, indicators and endings in random order."""
+    rng = random.Random(seed)
+    tokens = sorted(PaperProcessor.PHARMA_TERMS | PaperProcessor.ACADEMIC_TERMS) + INDICATORS + [
+        "inc", "corp", "co.", "ltd", "pty", "sa", "ag", "Inc.", "AG", "MEDICAL", "Pharma",
+        "usa", ", ", ".", " ", "  ", "\n", "\t", "x"
+    ]
+    return ["".join(rng.choice(tokens) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+EDGE_CASES = [
+    (None, False),
+    ("", False),
+    (" ", False),
+    ("a", False),
+    ("AG", True),
+    ("ag", True),
+    ("Inc.", True),
+    ("Novartis Pharma AG", True),
+    ("Novartis Pharma AG ", True),
+    ("Novartis Pharma AG\n", True),
+    ("Genentech Inc.\t", True),
+    ("Pfizer Inc, New York, NY, USA", True),
+    ("Pfizer Inc, New York, NY, USA.", True),
+    ("Harvard University, Boston, MA, USA", False),
+    ("Mayo Clinic, Rochester, MN, USA", False),
+    ("Stanford Medical Center Inc", False),
+    ("Acme Medical Inc, Boston", True),
+    ("Acme Medical, Boston", False),
+    ("Pharmacompany", True),
+    ("Roche Diagnostics GmbH, Mannheim, Germany", True),
+    ("Roche Diagnostics GmbH, Mannheim", True),
+]
+
+
+@pytest.fixture(params=["hyperscan", "ahocorasick", "regex"])
+def processor(request, monkeypatch):
+    """A processor whose scanners were compiled with only the requested backend available."""
+    if request.param == "hyperscan":
+        pytest.importorskip("hyperscan")
+    else:
+        monkeypatch.setattr(paper_processor, "hyperscan", None)
+        if request.param == "ahocorasick":
+            pytest.importorskip("ahocorasick")
+        else:
+            monkeypatch.setattr(paper_processor, "ahocorasick", None)
+
+    # Defining a subclass compiles its scanners with the backends available right now
+    class BackendProcessor(PaperProcessor):
+        pass
+
+    if request.param == "hyperscan":
+        assert BackendProcessor._hyperscan_db is not None
+    elif request.param == "ahocorasick":
+        assert BackendProcessor._hyperscan_db is None and BackendProcessor._automaton is not None
+    else:
+        assert BackendProcessor._hyperscan_db is None and BackendProcessor._automaton is None
+
+    return BackendProcessor()
+
+
+@pytest.mark.parametrize("affiliation,expected", EDGE_CASES)
+def test_edge_cases(processor, affiliation, expected):
+    assert reference_is_pharma_affiliation(affiliation) is expected
+    assert processor.is_pharma_affiliation(affiliation) is expected
+
+
+def test_matches_reference_loop(processor):
+    mismatches = [
+        affiliation for affiliation in random_affiliations()
+        if processor.is_pharma_affiliation(affiliation) != reference_is_pharma_affiliation(affiliation)
+    ]
+    assert mismatches == []
+
+
+def test_subclass_terms(processor):
+    class VaccineProcessor(type(processor)):
+        PHARMA_TERMS = PaperProcessor.PHARMA_TERMS | {"vaccines"}
+
+    assert not processor.is_pharma_affiliation("Acme Vaccines Inc, Boston")
+    assert VaccineProcessor().is_pharma_affiliation("Acme Vaccines Inc, Boston")
+
+
+def test_process_papers_uses_overridden_methods():
+    class UppercaseProcessor(PaperProcessor):
+        def is_pharma_affiliation(self, affiliation):
+            return affiliation.isupper()
+
+        def extract_company_name(self, affiliation):
+            return affiliation.title()
+
+    papers = [
+        {"pmid": "1", "title": "A", "authors": [{"name": "Ann", "affiliations": ["ACME"]}]},
+        {"pmid": "2", "title": "B", "authors": [{"name": "Bob", "affiliations": ["Novartis Pharma AG"]}]},
+    ]
+
+    processed = UppercaseProcessor().process_papers(papers)
+
+    assert [paper["PubmedID"] for paper in processed] == ["1"]
+    assert processed[0]["Company Affiliation(s)"] == "Acme"
@@ -0,0 +1,275 @@
+"""
+Tests for PubMedClient, against a mocked PubMed API and canned efetch XML.
+"""
+import io
+import threading
+import time
+
+import pytest
+import requests
+
+from pubmed_pharma_papers.pubmed_client import PubMedClient, SearchHistory, _RateLimiter
+
+# Search results in relevance order, enough for several efetch chunks
+SEARCH_PMIDS = [str(pmid) for pmid in range(41000000, 41001200)]
+WEBENV = "MCID_test"
+QUERY_KEY = "1"
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response."""
+
+    def __init__(self, json_data=None, body=b""):
+        self._json_data = json_data
+        self.raw = io.BytesIO(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.raw.close()
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._json_data
+
+
+def efetch_xml(pmids):
+    """Build an efetch response, in reverse order since efetch does not keep the requested order."""
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<ArticleTitle>Paper {pmid}</ArticleTitle>"
+        f"<AuthorList><Author><LastName>Doe</LastName><ForeName>Jane</ForeName>"
+        f"<AffiliationInfo><Affiliation>Acme Pharma Inc, Boston</Affiliation></AffiliationInfo>"
+        f"</Author></AuthorList></Article></MedlineCitation></PubmedArticle>"
+        for pmid in reversed(pmids)
+    )
+    return f"<PubmedArticleSet>{articles}</PubmedArticleSet>".encode()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Mock the esearch and efetch endpoints, returning the list of efetch request bodies."""
+    efetch_requests = []
+    lock = threading.Lock()
+
+    def fake_get(self, url, params=None, **kwargs):
+        assert url.endswith("esearch.fcgi")
+        assert params["usehistory"] == "y"
+        return FakeResponse(json_data={"esearchresult": {
+            "idlist": SEARCH_PMIDS[:params["retmax"]], "webenv": WEBENV, "querykey": QUERY_KEY
+        }})
+
+    def fake_post(self, url, data=None, stream=False, **kwargs):
+        assert url.endswith("efetch.fcgi")
+        with lock:
+            efetch_requests.append(data)
+
+        if "id" in data:
+            pmids = data["id"].split(",")
+        else:
+            assert (data["WebEnv"], data["query_key"]) == (WEBENV, QUERY_KEY)
+            pmids = SEARCH_PMIDS[data["retstart"]:data["retstart"] + data["retmax"]]
+        return FakeResponse(body=efetch_xml(pmids))
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    monkeypatch.setattr(_RateLimiter, "acquire", lambda self: None)
+    return efetch_requests
+
+
+def test_history_paging_without_cache(api):
+    client = PubMedClient()
+    pmids, history = client.search_with_history("cancer", max_results=1200)
+
+    papers = client.fetch_details(pmids, history=history)
+
+    assert history == SearchHistory(WEBENV, QUERY_KEY)
+    assert all("id" not in data for data in api)
+    assert sorted((data["retstart"], data["retmax"]) for data in api) == [(0, 500), (500, 500), (1000, 200)]
+    assert [paper["pmid"] for paper in papers] == pmids
+
+
+def test_partial_cache_posts_missing_ids(api, tmp_path):
+    pmids, history = PubMedClient().search_with_history("cancer", max_results=1200)
+    cached_pmids = pmids[::3]
+    PubMedClient(cache_dir=str(tmp_path)).fetch_details(cached_pmids)
+    api.clear()
+
+    papers = PubMedClient(cache_dir=str(tmp_path)).fetch_details(pmids, history=history)
+
+    # The history server pages would include the cached papers, so the missing IDs are posted instead
+    assert all("WebEnv" not in data for data in api)
+    posted_pmids = [pmid for data in api for pmid in data["id"].split(",")]
+    assert sorted(posted_pmids) == sorted(set(pmids) - set(cached_pmids))
+    assert [paper["pmid"] for paper in papers] == pmids
+    assert papers[0]["authors"][0]["affiliations"] == ["Acme Pharma Inc, Boston"]
+
+
+def test_fetch_by_ids_keeps_pmid_list_order(api):
+    pmids = [SEARCH_PMIDS[index] for index in (7, 3, 1100, 0, 512)]
+
+    papers = PubMedClient().fetch_details(pmids)
+
+    assert [paper["pmid"] for paper in papers] == pmids
+
+
+def test_rate_limiter_spaces_requests():
+    rate = 50
+    limiter = _RateLimiter(rate)
+    times = []
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: (limiter.acquire(), times.append(time.monotonic())))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Only the first request goes out immediately, the others follow one interval apart
+    assert max(times) - start >= 9 / rate * 0.9
+
+
+# A realistic efetch response, the book article sits between the two journal articles
+PARSER_XML = b"""<?xml version="1.0" ?>
+<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2025//EN" "https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_250101.dtd">
+<PubmedArticleSet>
+<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">38000001</PMID>
+    <Article PubModel="Print">
+      <Journal>
+        <JournalIssue CitedMedium="Internet">
+          <PubDate><Year>2024</Year><Month>Mar</Month><Day>15</Day></PubDate>
+        </JournalIssue>
+      </Journal>
+      <ArticleTitle>Kinase inhibitors in oncology.</ArticleTitle>
+      <AuthorList CompleteYN="Y">
+        <Author ValidYN="Y">
+          <LastName>Doe</LastName><ForeName>Jane</ForeName><Initials>J</Initials>
+          <AffiliationInfo><Affiliation>Acme Pharma Inc, Boston, MA, USA.</Affiliation></AffiliationInfo>
+        </Author>
+        <Author ValidYN="Y">
+          <LastName>Roe</LastName><Initials>R</Initials>
+        </Author>
+        <Author ValidYN="Y">
+          <CollectiveName>Oncology Trials Group</CollectiveName>
+        </Author>
+      </AuthorList>
+    </Article>
+    <CommentsCorrectionsList>
+      <CommentsCorrections RefType="CommentIn">
+        <RefSource>Nat Rev Drug Discov. 2024</RefSource>
+        <PMID Version="1">37999999</PMID>
+      </CommentsCorrections>
+    </CommentsCorrectionsList>
+  </MedlineCitation>
+</PubmedArticle>
+<PubmedBookArticle>
+  <BookDocument>
+    <PMID Version="1">20301295</PMID>
+    <ArticleTitle>GeneReviews</ArticleTitle>
+  </BookDocument>
+</PubmedBookArticle>
+<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">38000002</PMID>
+    <Article PubModel="Print">
+      <Journal>
+        <JournalIssue CitedMedium="Print">
+          <PubDate><MedlineDate>2023 Nov-Dec</MedlineDate></PubDate>
+        </JournalIssue>
+      </Journal>
+      <ArticleTitle>Biomarkers of response.</ArticleTitle>
+      <AuthorList CompleteYN="Y">
+        <Author ValidYN="Y">
+          <LastName>Smith</LastName><ForeName>John</ForeName>
+          <AffiliationInfo><Affiliation>Department of Oncology, Example University, Oslo, Norway.</Affiliation></AffiliationInfo>
+        </Author>
+        <Author ValidYN="Y">
+          <LastName>Lee</LastName><ForeName>Ann</ForeName>
+          <Identifier Source="email">ann.lee@acme-pharma.com</Identifier>
+          <AffiliationInfo><Affiliation>Acme Pharma Inc, Boston. lab@acme-pharma.com</Affiliation></AffiliationInfo>
+        </Author>
+        <Author ValidYN="Y">
+          <LastName>Kim</LastName><ForeName>Min</ForeName>
+          <AffiliationInfo><Affiliation>Example University, Seoul, Korea.</Affiliation></AffiliationInfo>
+          <AffiliationInfo><Affiliation>Beta Biotech Ltd, Seoul, Korea. min.kim@beta-bio.kr</Affiliation></AffiliationInfo>
+        </Author>
+        <Author ValidYN="Y">
+          <LastName>Novak</LastName><ForeName>Eva</ForeName>
+          <AffiliationInfo><Affiliation>Gamma Therapeutics AG, Basel. eva.novak@gamma.ch</Affiliation></AffiliationInfo>
+          <AffiliationInfo><Affiliation>Delta Health GmbH, Berlin. enovak@delta.de</Affiliation></AffiliationInfo>
+        </Author>
+        <Author ValidYN="Y">
+          <LastName>Silva</LastName><ForeName>Rui</ForeName>
+          <Identifier Source="ORCID">https://orcid.org/0000-0002-1825-0097?ref=rui@orcid.org</Identifier>
+          <AffiliationInfo>
+            <Affiliation>Epsilon Diagnostics, Lisbon, Portugal.</Affiliation>
+            <Identifier Source="ROR">https://ror.org/00example</Identifier>
+          </AffiliationInfo>
+        </Author>
+      </AuthorList>
+    </Article>
+  </MedlineCitation>
+</PubmedArticle>
+</PubmedArticleSet>
+"""
+
+
+def parse(xml):
+    return PubMedClient()._parse_papers(io.BytesIO(xml))
+
+
+def test_parse_articles():
+    papers = parse(PARSER_XML)
+
+    assert [paper["pmid"] for paper in papers] == ["38000001", "38000002"]
+
+    first, second = papers
+    assert first["title"] == "Kinase inhibitors in oncology."
+    assert first["publication_date"] == "15 Mar 2024"
+    assert [author["name"] for author in first["authors"]] == ["Jane Doe", "R Roe", "Oncology Trials Group"]
+    assert first["authors"][0]["affiliations"] == ["Acme Pharma Inc, Boston, MA, USA."]
+    assert first["authors"][1]["affiliations"] == []
+
+    # A MedlineDate has no Year element, so no date is reported
+    assert second["publication_date"] == ""
+    assert second["authors"][0]["affiliations"] == [
+        "Department of Oncology, Example University, Oslo, Norway."
+    ]
+
+
+def test_parse_truncated_document_keeps_complete_articles():
+    truncated = PARSER_XML[:PARSER_XML.index(b"<ArticleTitle>Biomarkers")]
+
+    papers = parse(truncated)
+
+    assert [paper["pmid"] for paper in papers] == ["38000001"]
+
+
+def test_parse_corresponding_emails():
+    authors = {author["name"]: author for author in parse(PARSER_XML)[1]["authors"]}
+
+    # An email identifier wins over emails in the affiliation text
+    assert authors["Ann Lee"]["email"] == "ann.lee@acme-pharma.com"
+    assert authors["Ann Lee"]["is_corresponding"]
+
+    # Every affiliation is searched, not just the first one
+    assert authors["Min Kim"]["email"] == "min.kim@beta-bio.kr"
+    assert authors["Min Kim"]["is_corresponding"]
+
+    # The email of the first affiliation wins
+    assert authors["Eva Novak"]["email"] == "eva.novak@gamma.ch"
+    assert authors["Eva Novak"]["is_corresponding"]
+
+    # Other identifiers are ignored, even when their text looks like an email
+    assert authors["Rui Silva"]["email"] == ""
+    assert not authors["Rui Silva"]["is_corresponding"]
+    assert authors["Rui Silva"]["affiliations"] == ["Epsilon Diagnostics, Lisbon, Portugal."]
+
+    assert authors["John Smith"]["email"] == ""
+    assert not authors["John Smith"]["is_corresponding"]